@@ -2,21 +2,69 @@
 if "__omp_prelude_loaded__" not in globals():
     __omp_prelude_loaded__ = True
     from pathlib import Path
-    import os, re, json, shutil, subprocess, inspect
+    import os, re, sys, json, mmap, shutil, subprocess, inspect, functools, contextlib, tempfile, threading
+    import difflib, fnmatch, heapq, signal as _signal
+    from collections import Counter, OrderedDict, deque
+    from concurrent.futures import ThreadPoolExecutor
     from datetime import datetime
     from IPython.display import display
+    try:
+        import hyperscan as _hyperscan
+    except ImportError:
+        _hyperscan = None
+    try:
+        import orjson as _orjson
+    except ImportError:
+        _orjson = None
+    if _orjson is not None:
+        # Some orjson releases turn integers wider than 64 bits into floats instead of raising;
+        # json keeps them exact, so only use orjson when it either keeps or rejects them
+        try:
+            if type(_orjson.loads("18446744073709551616")) is not int:
+                _orjson = None
+        except _orjson.JSONDecodeError:
+            pass
 
     def _emit_status(op: str, **data):
         """Emit structured status event for TUI rendering."""
         display({"application/x-omp-status": {"op": op, **data}}, raw=True)
 
+    _OMP_HELPERS: dict = {}
+    _PRELUDE_DOCS_CACHE: list[dict[str, str]] | None = None
+
     def _category(cat: str):
-        """Decorator to tag a prelude function with its category."""
+        """Decorator to tag a prelude function with its category and register it for docs.
+
+        Extension modules register their helpers with this decorator too; it is the only
+        way a function reaches __omp_prelude_docs__().
+        """
         def decorator(fn):
+            global _PRELUDE_DOCS_CACHE
             fn._omp_category = cat
+            # Keyed by name so a later definition replaces the earlier one
+            _OMP_HELPERS[fn.__name__] = fn
+            _PRELUDE_DOCS_CACHE = None
             return fn
         return decorator
 
+    @functools.lru_cache(maxsize=512)
+    def _compile(pattern: str | bytes, flags: int = 0) -> re.Pattern:
+        """Compile a regex once and reuse it across calls and files."""
+        return re.compile(pattern, flags)
+
+    def _compile_bytes(pattern: str, flags: int = 0) -> re.Pattern | None:
+        """Compile an ASCII str regex as a bytes regex, or None if it is only valid as str.
+
+        Patterns such as "\\u00e9", "\\N{...}" or "(?u)..." are legal str regexes but
+        rejected for bytes; callers then fall back to the str regex.
+        """
+        if not pattern.isascii() or flags & re.UNICODE:
+            return None
+        try:
+            return _compile(pattern.encode(), flags)
+        except re.error:
+            return None
+
     @_category("Shell")
     def env(key: str | None = None, value: str | None = None):
         """Get/set environment variables."""
@@ -32,37 +80,136 @@ if "__omp_prelude_loaded__" not in globals():
         _emit_status("env", key=key, value=val, action="get")
         return val
 
+    _SCAN_CHUNK = 1 << 20
+
+    def _skip_lines(buf, pos: int, n: int) -> tuple[int, int]:
+        """Advance past up to n lines starting at pos. Returns (offset, lines skipped).
+
+        An unterminated last line counts as a line when the end of buf is reached.
+        """
+        size = len(buf)
+        start = pos
+        skipped = 0
+        while skipped < n and pos < size:
+            chunk = buf[pos : pos + _SCAN_CHUNK]
+            found = chunk.count(b"\n")
+            if skipped + found < n:
+                skipped += found
+                pos += len(chunk)
+                continue
+            idx = -1
+            for _ in range(n - skipped):
+                idx = chunk.find(b"\n", idx + 1)
+            return pos + idx + 1, n
+        if skipped < n and size > start and buf[size - 1 : size] != b"\n":
+            skipped += 1
+        return min(pos, size), skipped
+
+    # Line breaks str.splitlines() honours besides "\n"; "\r" only counts when not part of "\r\n"
+    _ASCII_LINE_BREAKS = (b"\r", b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e")
+    _UTF8_LINE_BREAKS = (b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+
+    def _breaks_only_at_lf(buf, end: int) -> bool:
+        """Check that buf[:end] has no line breaks but "\n" and "\r\n", scanning in fixed-size slices."""
+        for pos in range(0, end, _SCAN_CHUNK):
+            # Two bytes of overlap, so a break straddling the slice boundary is seen whole
+            chunk = buf[pos : min(pos + _SCAN_CHUNK + 2, end)]
+            if b"\r" in chunk:
+                chunk = chunk.replace(b"\r\n", b"\n")
+            if any(brk in chunk for brk in _ASCII_LINE_BREAKS):
+                return False
+            if not chunk.isascii() and any(brk in chunk for brk in _UTF8_LINE_BREAKS):
+                return False
+        return True
+
+    def _read_line_window(p: Path, skip: int, limit: int | None) -> tuple[str, int] | None:
+        """Decode `limit` lines after the first `skip` lines (to EOF if None), keeping line ends.
+
+        The file is memory-mapped and scanned for newlines, so only the window is decoded.
+        "\r\n" is returned as "\n". Returns (text, lines actually skipped), or None when a
+        bare "\r" or another str.splitlines() break appears before the window ends; callers
+        then number lines from the full read_text().splitlines().
+        """
+        with p.open("rb") as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty or unmappable (e.g. special) files
+                buf = f.read()
+            try:
+                start, skipped = _skip_lines(buf, 0, skip)
+                end = len(buf) if limit is None else _skip_lines(buf, start, limit)[0]
+                if not _breaks_only_at_lf(buf, end):
+                    return None
+                text = buf[start:end].decode("utf-8")
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        return text, skipped
+
     @_category("File I/O")
     def read(path: str | Path, *, offset: int = 1, limit: int | None = None) -> str:
         """Read file contents. offset/limit are 1-indexed line numbers."""
         p = Path(path)
-        data = p.read_text(encoding="utf-8")
-        lines = data.splitlines(keepends=True)
-        if offset > 1 or limit is not None:
-            start = max(0, offset - 1)
-            end = start + limit if limit else len(lines)
-            lines = lines[start:end]
-            data = "".join(lines)
+        window = None
+        # A negative limit slices from the end, which needs the whole file
+        if (offset > 1 or limit is not None) and (limit is None or limit >= 0):
+            window = _read_line_window(p, max(0, offset - 1), limit or None)
+        if window is not None:
+            data = window[0]
+        else:
+            data = p.read_text(encoding="utf-8")
+            if offset > 1 or limit is not None:
+                lines = data.splitlines(keepends=True)
+                start = max(0, offset - 1)
+                end = start + limit if limit else len(lines)
+                data = "".join(lines[start:end])
         preview = data[:500]
         _emit_status("read", path=str(p), chars=len(data), preview=preview)
         return data
 
+    def _write_all(p: Path, data: bytes, flags: int) -> None:
+        """Write bytes with raw os.open/os.write, skipping the buffered file object layers."""
+        fd = os.open(p, os.O_WRONLY | os.O_CREAT | flags, 0o666)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _atomic_writer(path: Path):
+        """Yield a binary temp file beside path that atomically replaces it on success."""
+        target = Path(os.path.realpath(path))
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            shutil.copymode(target, tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
     @_category("File I/O")
-    def write(path: str | Path, content: str) -> Path:
-        """Write file contents (create parents)."""
+    def write(path: str | Path, content: str | bytes) -> Path:
+        """Write file contents (create parents). Bytes are written as-is."""
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(content, encoding="utf-8")
+        _write_all(p, content if isinstance(content, bytes) else content.encode("utf-8"), os.O_TRUNC)
         _emit_status("write", path=str(p), chars=len(content))
         return p
 
     @_category("File I/O")
-    def append(path: str | Path, content: str) -> Path:
-        """Append to file."""
+    def append(path: str | Path, content: str | bytes) -> Path:
+        """Append to file. Bytes are written as-is."""
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        with p.open("a", encoding="utf-8") as f:
-            f.write(content)
+        _write_all(p, content if isinstance(content, bytes) else content.encode("utf-8"), os.O_APPEND)
         _emit_status("append", path=str(p), chars=len(content))
         return p
 
@@ -106,50 +253,187 @@ if "__omp_prelude_loaded__" not in globals():
         _emit_status("cp", src=str(src_p), dst=str(dst_p))
         return dst_p
 
-    def _load_gitignore_patterns(base: Path) -> list[str]:
-        """Load .gitignore patterns from base directory and parents."""
+    def _union_glob(patterns: list[str]) -> re.Pattern:
+        """Translate glob patterns into a single alternation regex."""
+        if not patterns:
+            return re.compile(r"(?!)")
+        return re.compile("|".join(f"(?:{fnmatch.translate(pat)})" for pat in patterns))
+
+    _IGNORE_FILE_CACHE: dict[str, tuple[int, list[str]]] = {}
+
+    def _read_gitignore(directory: Path, mtime_ns: int) -> list[str]:
+        """Parse directory/.gitignore into fnmatch patterns, reusing the last parse while mtime_ns matches."""
+        gitignore = str(directory / ".gitignore")
+        cached = _IGNORE_FILE_CACHE.get(gitignore)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
         patterns: list[str] = []
-        # Always exclude these
-        patterns.extend(["**/.git", "**/.git/**", "**/node_modules", "**/node_modules/**"])
+        try:
+            for line in Path(gitignore).read_text().splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    # Normalize pattern for fnmatch
+                    if line.startswith("/"):
+                        patterns.append(str(directory / line[1:]))
+                    else:
+                        patterns.append(f"**/{line}")
+        except Exception:
+            pass
+        _IGNORE_FILE_CACHE[gitignore] = (mtime_ns, patterns)
+        return patterns
+
+    _GITIGNORE_CACHE: dict[Path, tuple[tuple[tuple[Path, int], ...], tuple[re.Pattern, re.Pattern, re.Pattern]]] = {}
+
+    def _load_gitignore_patterns(base: Path) -> tuple[re.Pattern, re.Pattern, re.Pattern]:
+        """Load .gitignore patterns from base directory and parents.
+
+        Returns (rel_rx, part_rx, abs_rx) regexes compiled from all patterns.
+        Cached per base directory until any .gitignore along the walk changes.
+        """
+        root = base.resolve()
         # Walk up to find .gitignore files
-        current = base.resolve()
+        found: list[tuple[Path, int]] = []
+        current = root
         for _ in range(20):  # Limit depth
-            gitignore = current / ".gitignore"
-            if gitignore.exists():
-                try:
-                    for line in gitignore.read_text().splitlines():
-                        line = line.strip()
-                        if line and not line.startswith("#"):
-                            # Normalize pattern for fnmatch
-                            if line.startswith("/"):
-                                patterns.append(str(current / line[1:]))
-                            else:
-                                patterns.append(f"**/{line}")
-                except Exception:
-                    pass
+            try:
+                found.append((current, os.stat(current / ".gitignore").st_mtime_ns))
+            except OSError:
+                pass
             parent = current.parent
             if parent == current:
                 break
             current = parent
-        return patterns
+        key = tuple(found)
+        cached = _GITIGNORE_CACHE.get(root)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        patterns: list[str] = []
+        # Always exclude these
+        patterns.extend(["**/.git", "**/.git/**", "**/node_modules", "**/node_modules/**"])
+        for current, mtime_ns in found:
+            patterns.extend(_read_gitignore(current, mtime_ns))
+        anywhere = [pat for pat in patterns if pat.startswith("**/")]
+        anchored = [pat for pat in patterns if not pat.startswith("**/")]
+        components = [pat[3:] for pat in anywhere]
+        compiled = (_union_glob(anywhere + components + anchored), _union_glob(components), _union_glob(anchored))
+        _GITIGNORE_CACHE[root] = (key, compiled)
+        return compiled
+
+    def _match_gitignore(path_str: str, patterns: tuple[re.Pattern, re.Pattern, re.Pattern], base_str: str) -> bool:
+        """Check if path matches any gitignore pattern.
+
+        path_str is absolute; base_str is the resolved search root with a trailing separator.
+        """
+        rel_rx, part_rx, abs_rx = patterns
+        rel = path_str[len(base_str):] if path_str.startswith(base_str) else path_str
+        if rel_rx.match(rel) or abs_rx.match(path_str):
+            return True
+        # Unanchored patterns also match any single path component
+        return any(part_rx.match(part) for part in rel.split(os.sep))
+
+    def _glob_segments(pattern: str) -> tuple[tuple[re.Pattern | None, ...], bool]:
+        """Split an rglob pattern into per-component matchers (None for "**") and a dirs-only flag.
 
-    def _match_gitignore(path: Path, patterns: list[str], base: Path) -> bool:
-        """Check if path matches any gitignore pattern."""
-        import fnmatch
-        rel = str(path.relative_to(base)) if path.is_relative_to(base) else str(path)
-        abs_path = str(path.resolve())
-        for pat in patterns:
-            if pat.startswith("**/"):
-                # Match against any part of the path
-                if fnmatch.fnmatch(rel, pat) or fnmatch.fnmatch(rel, pat[3:]):
+        Mirrors Path.rglob: the pattern is implicitly prefixed with "**/", "**" spans
+        zero or more directories, and a trailing "/" or "**" matches directories only.
+        """
+        segments: list[re.Pattern | None] = [None]
+        for seg in pattern.split("/"):
+            if not seg or seg == ".":
+                continue
+            if seg == "**":
+                if segments[-1] is not None:
+                    segments.append(None)
+            else:
+                segments.append(_compile(fnmatch.translate(seg)))
+        dir_only = pattern.endswith("/") or segments[-1] is None
+        return tuple(segments), dir_only
+
+    def _glob_match(parts: list[str], segments: tuple[re.Pattern | None, ...], i: int = 0, j: int = 0) -> bool:
+        """Match path components against _glob_segments output."""
+        while j < len(segments):
+            seg = segments[j]
+            if seg is None:
+                if j + 1 == len(segments):
                     return True
-                # Also check each path component
-                for part in path.parts:
-                    if fnmatch.fnmatch(part, pat[3:]):
-                        return True
-            elif fnmatch.fnmatch(abs_path, pat) or fnmatch.fnmatch(rel, pat):
-                return True
-        return False
+                return any(_glob_match(parts, segments, k, j + 1) for k in range(i, len(parts)))
+            if i == len(parts) or not seg.match(parts[i]):
+                return False
+            i += 1
+            j += 1
+        return i == len(parts)
+
+    def _walk(
+        base: Path,
+        pattern: str,
+        ignore_patterns: tuple[re.Pattern, re.Pattern, re.Pattern],
+        hidden: bool,
+        maxdepth: int | None = None,
+    ):
+        """Yield (path, entry, depth) under base matching pattern (like rglob).
+
+        Hidden and gitignored directories are pruned, as is anything deeper than maxdepth.
+        Depth is relative to base (1 = direct children); entry is the os.DirEntry with cached stat info.
+        """
+        if "/" in pattern or "**" in pattern:
+            name_rx = None
+            segments, dir_only = _glob_segments(pattern)
+        else:
+            # Single-component patterns only need the entry name
+            name_rx = _compile(fnmatch.translate(pattern))
+        base_str = os.path.join(str(base.resolve()), "")
+        stack = [(base, base_str, 1)]
+        while stack:
+            current, current_str, depth = stack.pop()
+            try:
+                with os.scandir(current_str) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            subdirs: list[tuple[Path, str, int]] = []
+            for entry in entries:
+                name = entry.name
+                # Skip hidden entries unless requested
+                if not hidden and name.startswith("."):
+                    continue
+                item_str = current_str + name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if name_rx is not None:
+                    matched = name_rx.match(name) is not None
+                else:
+                    matched = (is_dir or not dir_only) and _glob_match(item_str[len(base_str):].split(os.sep), segments)
+                if not matched and not is_dir:
+                    continue
+                # Skip gitignored paths, never descending into ignored directories
+                if _match_gitignore(item_str, ignore_patterns, base_str):
+                    continue
+                item = current / name
+                if matched:
+                    yield item, entry, depth
+                if is_dir and (maxdepth is None or depth < maxdepth):
+                    subdirs.append((item, item_str + os.sep, depth + 1))
+            stack.extend(reversed(subdirs))
+
+    _IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+    def _parallel_map(fn, items, workers: int = _IO_WORKERS):
+        """Map fn over items in a thread pool, yielding results in order.
+
+        Submission runs a bounded window ahead of the consumer; closing the
+        generator early cancels work that has not started yet.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            try:
+                for item in items:
+                    pending.append(pool.submit(fn, item))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
 
     @_category("Search")
     def find(
@@ -168,37 +452,222 @@ if "__omp_prelude_loaded__" not in globals():
         maxdepth/mindepth are relative to path (0 = path itself, 1 = direct children).
         """
         p = Path(path).resolve()
-        base_depth = len(p.parts)
         ignore_patterns = _load_gitignore_patterns(p)
-        matches: list[Path] = []
-        for m in p.rglob(pattern):
-            if len(matches) >= limit:
-                break
-            # Check depth constraints
-            rel_depth = len(m.resolve().parts) - base_depth
-            if maxdepth is not None and rel_depth > maxdepth:
-                continue
-            if mindepth is not None and rel_depth < mindepth:
-                continue
-            # Skip hidden files unless requested
-            if not hidden and any(part.startswith(".") for part in m.parts):
-                continue
-            # Skip gitignored paths
-            if _match_gitignore(m, ignore_patterns, p):
-                continue
-            # Filter by type
-            if type == "file" and m.is_dir():
-                continue
-            if type == "dir" and not m.is_dir():
-                continue
-            matches.append(m)
+        # (path, mtime) pairs; mtime comes from the cached entry stat and is only read when sorting by it
+        found: list[tuple[Path, float]] = []
+        if maxdepth is None or maxdepth >= 1:
+            for m, entry, depth in _walk(p, pattern, ignore_patterns, hidden, maxdepth):
+                if len(found) >= limit:
+                    break
+                if mindepth is not None and depth < mindepth:
+                    continue
+                # Filter by type
+                if type == "file" and entry.is_dir():
+                    continue
+                if type == "dir" and not entry.is_dir():
+                    continue
+                found.append((m, entry.stat().st_mtime if sort_by_mtime else 0.0))
         if sort_by_mtime:
-            matches.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+            found.sort(key=lambda x: x[1], reverse=True)
+            matches = [m for m, _ in found]
         else:
-            matches.sort()
+            matches = sorted(m for m, _ in found)
         _emit_status("find", pattern=pattern, path=str(p), count=len(matches), matches=[str(m) for m in matches[:20]])
         return matches
 
+    def _line_matchers(pattern: str, ignore_case: bool, literal: bool):
+        """Build (str, bytes) line predicates for grep-style matching.
+
+        The bytes predicate is None for non-ASCII patterns and for regexes that
+        only compile as str. Callers only use it on ASCII lines, which it matches
+        without decoding.
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if literal:
+            if ignore_case:
+                needle = pattern.lower()
+                match_str = lambda line: needle in line.lower()
+            else:
+                match_str = lambda line: pattern in line
+        else:
+            rx = _compile(pattern, flags)
+            match_str = lambda line: rx.search(line) is not None
+        if not pattern.isascii():
+            return match_str, None
+        if literal:
+            if ignore_case:
+                needle_b = pattern.lower().encode()
+                match_bytes = lambda line: needle_b in line.lower()
+            else:
+                pattern_b = pattern.encode()
+                match_bytes = lambda line: pattern_b in line
+        else:
+            rx_b = _compile_bytes(pattern, flags)
+            if rx_b is None:
+                return match_str, None
+            match_bytes = lambda line: rx_b.search(line) is not None
+        return match_str, match_bytes
+
+    @functools.lru_cache(maxsize=64)
+    def _literal_prefilter(pattern: str, ignore_case: bool):
+        """Build a literal check over an open binary file backed by Hyperscan, or None when unavailable.
+
+        The check answers "may contain": a False result means no line can match.
+        """
+        if _hyperscan is None or not pattern or (ignore_case and not pattern.isascii()):
+            return None
+        flags = _hyperscan.HS_FLAG_SINGLEMATCH
+        if ignore_case:
+            flags |= _hyperscan.HS_FLAG_CASELESS
+        db = _hyperscan.Database()
+        try:
+            db.compile(expressions=[re.escape(pattern).encode("utf-8")], ids=[0], elements=1, flags=[flags])
+        except Exception:
+            return None
+        # Consecutive blocks share this many bytes so a match across a block boundary is still seen
+        overlap = len(pattern.encode("utf-8")) - 1
+        # Scratch space cannot be shared by concurrent scans; give each worker thread its own
+        local = threading.local()
+
+        def may_contain(f) -> bool:
+            scratch = getattr(local, "scratch", None)
+            if scratch is None:
+                scratch = local.scratch = _hyperscan.Scratch(db)
+            found: list[bool] = []
+            tail = b""
+            while True:
+                chunk = f.read(_SCAN_CHUNK)
+                if not chunk:
+                    return False
+                # Hyperscan folds ASCII case only; defer to the line matcher for other text
+                if ignore_case and not chunk.isascii():
+                    return True
+                block = tail + chunk
+                db.scan(block, match_event_handler=lambda *_: found.append(True), scratch=scratch)
+                if found:
+                    return True
+                tail = block[-overlap:] if overlap else b""
+
+        return may_contain
+
+    def _grep_lines(path: Path, match_str, match_bytes, prefilter=None):
+        """Stream (line_number, text, matched) from a file without loading it whole.
+
+        ASCII lines are matched as bytes and only decoded when the caller asks for text.
+        With a prefilter, the file is first scanned in fixed-size blocks and skipped if it cannot match.
+        """
+        with open(path, "rb") as f:
+            if prefilter is not None:
+                if not prefilter(f):
+                    return
+                f.seek(0)
+            for i, raw in enumerate(f, 1):
+                raw = raw.rstrip(b"\r\n")
+                if match_bytes is not None and raw.isascii():
+                    yield i, raw, match_bytes(raw)
+                else:
+                    line = raw.decode("utf-8")
+                    yield i, line, match_str(line)
+
+    def _line_text(line: str | bytes) -> str:
+        """Decode a line yielded by _grep_lines."""
+        return line.decode("ascii") if type(line) is bytes else line
+
+    def _is_ascii(buf) -> bool:
+        """Check a buffer for ASCII in fixed-size slices, so a memory map is never copied whole."""
+        return all(buf[pos : pos + _SCAN_CHUNK].isascii() for pos in range(0, len(buf), _SCAN_CHUNK))
+
+    def _buffer_finder(pattern: str, ignore_case: bool, literal: bool):
+        """Build find(buf, pos) -> (start, end) of the next match in a whole ASCII buffer, or None.
+
+        Returns None for patterns whose matches depend on the line being searched on its own:
+        lookarounds and \\A/\\Z see past the line end in a whole buffer. A match that spans
+        a line break is a false positive the caller re-checks against the single line.
+        """
+        if not pattern.isascii():
+            return None
+        if literal and not ignore_case:
+            needle = pattern.encode()
+            size = len(needle)
+
+            def find(buf, pos):
+                at = buf.find(needle, pos)
+                return None if at < 0 else (at, at + size)
+
+            return find
+        if literal:
+            rx = _compile_bytes(re.escape(pattern), re.IGNORECASE)
+        elif any(tok in pattern for tok in ("(?=", "(?!", "(?<", "\\A", "\\Z")):
+            return None
+        else:
+            rx = _compile_bytes(pattern, (re.IGNORECASE if ignore_case else 0) | re.MULTILINE)
+        if rx is None:
+            return None
+
+        def find(buf, pos):
+            m = rx.search(buf, pos)
+            return None if m is None else m.span()
+
+        return find
+
+    def _grep_buffer(buf, find, match_bytes, context: int) -> tuple[int, list[tuple[int, str]]]:
+        """Grep an ASCII buffer by searching it whole. Returns (match count, hits).
+
+        Line numbers are counted only across the gaps between matches.
+        """
+        size = len(buf)
+        hits: list[tuple[int, str]] = []
+        match_count = 0
+        lineno, line_start = 1, 0
+        # Highest line number already in hits, and the offset of the line after it
+        shown, shown_end = 0, 0
+        pos = 0
+        while pos <= size:
+            span = find(buf, pos)
+            if span is None:
+                break
+            at, stop = span
+            if at == size and (size == 0 or buf[size - 1 : size] == b"\n"):
+                # Empty match past the final newline, which ends the last line
+                break
+            nl = buf.rfind(b"\n", line_start, at)
+            start = line_start if nl < 0 else nl + 1
+            lineno += buf[line_start:start].count(b"\n")
+            line_start = start
+            end = buf.find(b"\n", at)
+            if end < 0:
+                end = size
+            pos = end + 1
+            raw = buf[start:end].rstrip(b"\r")
+            # A match running past the line (into the line break or beyond) may not hold on the line alone
+            if stop > start + len(raw) and not match_bytes(raw):
+                continue
+            match_count += 1
+            if not context:
+                hits.append((lineno, raw.decode("ascii")))
+                continue
+            if lineno > shown:
+                first = max(shown + 1, lineno - context)
+                starts: list[int] = []
+                s = start
+                for _ in range(lineno - first):
+                    s = buf.rfind(b"\n", 0, s - 1) + 1
+                    starts.append(s)
+                for n, s in enumerate(reversed(starts), first):
+                    e = buf.find(b"\n", s)
+                    hits.append((n, buf[s:e].rstrip(b"\r").decode("ascii")))
+                hits.append((lineno, raw.decode("ascii")))
+                shown, shown_end = lineno, end + 1
+            s = shown_end
+            while shown < lineno + context and s < size:
+                e = buf.find(b"\n", s)
+                if e < 0:
+                    e = size
+                hits.append((shown + 1, buf[s:e].rstrip(b"\r").decode("ascii")))
+                shown, s = shown + 1, e + 1
+            shown_end = s
+        return match_count, hits
+
     @_category("Search")
     def grep(
         pattern: str,
@@ -210,34 +679,58 @@ if "__omp_prelude_loaded__" not in globals():
     ) -> list[tuple[int, str]]:
         """Grep a single file. Returns (line_number, text) tuples."""
         p = Path(path)
-        lines = p.read_text(encoding="utf-8").splitlines()
-        if literal:
-            if ignore_case:
-                match_fn = lambda line: pattern.lower() in line.lower()
-            else:
-                match_fn = lambda line: pattern in line
-        else:
-            flags = re.IGNORECASE if ignore_case else 0
-            rx = re.compile(pattern, flags)
-            match_fn = lambda line: rx.search(line) is not None
-        
-        match_lines: set[int] = set()
-        for i, line in enumerate(lines, 1):
-            if match_fn(line):
-                match_lines.add(i)
+        context = max(context, 0)
+        match_str, match_bytes = _line_matchers(pattern, ignore_case, literal)
+        find = _buffer_finder(pattern, ignore_case, literal) if match_bytes is not None else None
         
-        # Expand with context
-        if context > 0:
-            expanded: set[int] = set()
-            for ln in match_lines:
-                for offset in range(-context, context + 1):
-                    expanded.add(ln + offset)
-            output_lines = sorted(ln for ln in expanded if 1 <= ln <= len(lines))
-        else:
-            output_lines = sorted(match_lines)
+        hits: list[tuple[int, str]] = []
+        match_count = 0
+        with p.open("rb") as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty or unmappable (e.g. special) files
+                buf = f.read()
+            if isinstance(buf, mmap.mmap) and len(buf) > _SCAN_CHUNK and hasattr(mmap, "MADV_SEQUENTIAL"):
+                # Only worth a readahead hint once the file spans more than one block
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            try:
+                if find is not None and _is_ascii(buf) and (
+                    # Per line, "$" matches before a stripped "\r"; a whole-buffer search would not
+                    literal or "$" not in pattern or buf.find(b"\r") < 0
+                ):
+                    match_count, hits = _grep_buffer(buf, find, match_bytes, context)
+                else:
+                    prefilter = _literal_prefilter(pattern, ignore_case) if literal else None
+                    f.seek(0)
+                    if prefilter is None or prefilter(f):
+                        f.seek(0)
+                        # Rolling window of lines preceding the next match, plus lines still owed after the last one
+                        before: deque = deque(maxlen=context)
+                        after = 0
+                        for i, raw in enumerate(f, 1):
+                            raw = raw.rstrip(b"\r\n")
+                            if match_bytes is not None and raw.isascii():
+                                line, matched = raw, match_bytes(raw)
+                            else:
+                                line = raw.decode("utf-8")
+                                matched = match_str(line)
+                            if matched:
+                                match_count += 1
+                                hits.extend((ln, _line_text(prev)) for ln, prev in before)
+                                before.clear()
+                                hits.append((i, _line_text(line)))
+                                after = context
+                            elif after > 0:
+                                hits.append((i, _line_text(line)))
+                                after -= 1
+                            elif context > 0:
+                                before.append((i, line))
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
         
-        hits = [(ln, lines[ln - 1]) for ln in output_lines]
-        _emit_status("grep", pattern=pattern, path=str(p), count=len(match_lines), hits=[{"line": h[0], "text": h[1][:100]} for h in hits[:10]])
+        _emit_status("grep", pattern=pattern, path=str(p), count=match_count, hits=[{"line": h[0], "text": h[1][:100]} for h in hits[:10]])
         return hits
 
     @_category("Search")
@@ -252,53 +745,63 @@ if "__omp_prelude_loaded__" not in globals():
         hidden: bool = False,
     ) -> list[tuple[Path, int, str]]:
         """Recursive grep across files matching glob_pattern. Respects .gitignore."""
-        if literal:
-            if ignore_case:
-                match_fn = lambda line: pattern.lower() in line.lower()
-            else:
-                match_fn = lambda line: pattern in line
-        else:
-            flags = re.IGNORECASE if ignore_case else 0
-            rx = re.compile(pattern, flags)
-            match_fn = lambda line: rx.search(line) is not None
-        
-        base = Path(path)
-        ignore_patterns = _load_gitignore_patterns(base)
-        hits: list[tuple[Path, int, str]] = []
-        for file_path in base.rglob(glob_pattern):
-            if len(hits) >= limit:
-                break
-            if file_path.is_dir():
-                continue
-            # Skip hidden files unless requested
-            if not hidden and any(part.startswith(".") for part in file_path.parts):
-                continue
-            # Skip gitignored paths
-            if _match_gitignore(file_path, ignore_patterns, base):
-                continue
+        match_str, match_bytes = _line_matchers(pattern, ignore_case, literal)
+        prefilter = _literal_prefilter(pattern, ignore_case) if literal else None
+
+        def scan(file_path: Path) -> tuple[Path, list[int], list[str]]:
+            linenos: list[int] = []
+            texts: list[str] = []
             try:
-                lines = file_path.read_text(encoding="utf-8").splitlines()
+                for i, line, matched in _grep_lines(file_path, match_str, match_bytes, prefilter):
+                    if matched:
+                        linenos.append(i)
+                        texts.append(_line_text(line))
+                        if len(linenos) >= limit:
+                            break
             except Exception:
-                continue
-            for i, line in enumerate(lines, 1):
-                if len(hits) >= limit:
+                return file_path, [], []
+            return file_path, linenos, texts
+
+        base = Path(path)
+        ignore_patterns = _load_gitignore_patterns(base)
+        files = (fp for fp, entry, _ in _walk(base, glob_pattern, ignore_patterns, hidden) if not entry.is_dir())
+        # Hits are accumulated as parallel columns; tuples are only built on return
+        hit_paths: list[Path] = []
+        hit_lines: list[int] = []
+        hit_texts: list[str] = []
+        if limit > 0:
+            results = _parallel_map(scan, files)
+            for file_path, linenos, texts in results:
+                if not linenos:
+                    continue
+                take = min(len(linenos), limit - len(hit_lines))
+                hit_paths.extend([file_path] * take)
+                hit_lines.extend(linenos[:take])
+                hit_texts.extend(texts[:take])
+                if len(hit_lines) >= limit:
+                    results.close()
                     break
-                if match_fn(line):
-                    hits.append((file_path, i, line))
-        _emit_status("rgrep", pattern=pattern, path=str(base), count=len(hits), hits=[{"file": str(h[0]), "line": h[1], "text": h[2][:80]} for h in hits[:10]])
-        return hits
+        _emit_status("rgrep", pattern=pattern, path=str(base), count=len(hit_lines), hits=[{"file": str(f), "line": ln, "text": t[:80]} for f, ln, t in zip(hit_paths[:10], hit_lines, hit_texts)])
+        return list(zip(hit_paths, hit_lines, hit_texts))
 
     @_category("Find/Replace")
     def replace(path: str | Path, pattern: str, repl: str, *, regex: bool = False) -> int:
-        """Replace text in a file (regex optional)."""
+        """Replace text in a file (regex optional). Line endings are handled as in sed()."""
         p = Path(path)
-        data = p.read_text(encoding="utf-8")
+        raw, crlf = _normalize_newlines(p.read_bytes())
+        data = raw.decode("utf-8")
         if regex:
-            new, count = re.subn(pattern, repl, data)
+            new, count = _compile(pattern).subn(repl, data)
+        elif pattern:
+            # Single scan: split finds and counts occurrences at once
+            parts = data.split(pattern)
+            count = len(parts) - 1
+            new = repl.join(parts)
         else:
             new = data.replace(pattern, repl)
             count = data.count(pattern)
-        p.write_text(new, encoding="utf-8")
+        new_data = new.encode("utf-8")
+        p.write_bytes(new_data.replace(b"\n", b"\r\n") if crlf else new_data)
         _emit_status("replace", path=str(p), count=count)
         return count
 
@@ -322,8 +825,6 @@ if "__omp_prelude_loaded__" not in globals():
         _emit_status("sh", cmd=cmd[:80], code=proc.returncode, output=output[:500])
         return ShellResult(proc.stdout, proc.stderr, proc.returncode)
 
-    import signal as _signal
-
     def _run_with_interrupt(args: list[str], cwd: str | None, timeout: int | None, cmd: str) -> ShellResult:
         """Run subprocess with proper interrupt handling."""
         proc = subprocess.Popen(
@@ -407,13 +908,18 @@ if "__omp_prelude_loaded__" not in globals():
         reverse: True for descending (most common first), False for ascending
         Returns: [(count, item), ...] sorted by count
         """
-        from collections import Counter
         if isinstance(items, str):
             items = items.splitlines()
         counts = Counter(items)
-        sorted_items = sorted(counts.items(), key=lambda x: (x[1], x[0]), reverse=reverse)
-        if limit is not None:
-            sorted_items = sorted_items[:limit]
+        key = lambda x: (x[1], x[0])
+        if limit is not None and 0 < limit and limit * 4 < len(counts):
+            # Heap selection: O(U log limit) and identical to sorted(...)[:limit]
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            sorted_items = select(limit, counts.items(), key=key)
+        else:
+            sorted_items = sorted(counts.items(), key=key, reverse=reverse)
+            if limit is not None:
+                sorted_items = sorted_items[:limit]
         result = [(count, item) for item, count in sorted_items]
         _emit_status("counter", unique=len(counts), total=sum(counts.values()), top=result[:10])
         return result
@@ -434,22 +940,24 @@ if "__omp_prelude_loaded__" not in globals():
     def tree(path: str | Path = ".", *, max_depth: int = 3, show_hidden: bool = False) -> str:
         """Return directory tree."""
         base = Path(path)
-        lines = []
-        def walk(p: Path, prefix: str, depth: int):
-            if depth > max_depth:
-                return
-            items = sorted(p.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-            items = [i for i in items if show_hidden or not i.name.startswith(".")]
-            for i, item in enumerate(items):
-                is_last = i == len(items) - 1
-                connector = "└── " if is_last else "├── "
-                suffix = "/" if item.is_dir() else ""
-                lines.append(f"{prefix}{connector}{item.name}{suffix}")
-                if item.is_dir():
-                    ext = "    " if is_last else "│   "
-                    walk(item, prefix + ext, depth + 1)
-        lines.append(str(base) + "/")
-        walk(base, "", 1)
+        lines = [str(base) + "/"]
+        def children(dir_path: str | Path, prefix: str, depth: int) -> list[tuple[os.DirEntry, str, int, bool]]:
+            with os.scandir(dir_path) as it:
+                items = [e for e in it if show_hidden or not e.name.startswith(".")]
+            items.sort(key=lambda e: (not e.is_dir(follow_symlinks=False), e.name.lower()))
+            last = len(items) - 1
+            # Reversed so the first child is popped first
+            return [(item, prefix, depth, i == last) for i, item in reversed(list(enumerate(items)))]
+        stack = children(base, "", 1) if max_depth >= 1 else []
+        while stack:
+            item, prefix, depth, is_last = stack.pop()
+            is_dir = item.is_dir(follow_symlinks=False)
+            connector = "└── " if is_last else "├── "
+            suffix = "/" if is_dir else ""
+            lines.append(f"{prefix}{connector}{item.name}{suffix}")
+            if is_dir and depth < max_depth:
+                ext = "    " if is_last else "│   "
+                stack.extend(children(item.path, prefix + ext, depth + 1))
         out = "\n".join(lines)
         _emit_status("tree", path=str(base), entries=len(lines) - 1, preview=out[:1000])
         return out
@@ -473,7 +981,6 @@ if "__omp_prelude_loaded__" not in globals():
     @_category("Batch")
     def diff(a: str | Path, b: str | Path) -> str:
         """Compare two files, return unified diff."""
-        import difflib
         path_a, path_b = Path(a), Path(b)
         lines_a = path_a.read_text(encoding="utf-8").splitlines(keepends=True)
         lines_b = path_b.read_text(encoding="utf-8").splitlines(keepends=True)
@@ -487,26 +994,41 @@ if "__omp_prelude_loaded__" not in globals():
         """Non-recursive glob (use find() for recursive). Respects .gitignore."""
         p = Path(path)
         ignore_patterns = _load_gitignore_patterns(p)
+        base_str = os.path.join(str(p.resolve()), "")
         matches: list[Path] = []
         for m in p.glob(pattern):
             # Skip hidden files unless requested
             if not hidden and m.name.startswith("."):
                 continue
             # Skip gitignored paths
-            if _match_gitignore(m, ignore_patterns, p):
+            if _match_gitignore(base_str + str(m.relative_to(p)), ignore_patterns, base_str):
                 continue
             matches.append(m)
         matches = sorted(matches)
         _emit_status("glob", pattern=pattern, path=str(p), count=len(matches), matches=[str(m) for m in matches[:20]])
         return matches
 
+    def _normalize_newlines(data: bytes) -> tuple[bytes, bool]:
+        """Translate line endings to \\n as read_text() does; also report whether every line ending was CRLF.
+
+        Only files that are CRLF throughout get CRLF back; files with mixed endings are written with \\n.
+        """
+        if b"\r" not in data:
+            return data, False
+        crlf = data.count(b"\r\n") == data.count(b"\n") == data.count(b"\r")
+        return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n"), crlf
+
     @_category("Find/Replace")
     def sed(path: str | Path, pattern: str, repl: str, *, flags: int = 0) -> int:
-        """Regex replace in file (like sed -i). Returns count."""
+        """Regex replace in file (like sed -i). Returns count.
+        
+        The pattern sees \\n line endings; CRLF files are written back with CRLF.
+        """
         p = Path(path)
-        data = p.read_text(encoding="utf-8")
-        new, count = re.subn(pattern, repl, data, flags=flags)
-        p.write_text(new, encoding="utf-8")
+        data, crlf = _normalize_newlines(p.read_bytes())
+        new, count = _compile(pattern, flags).subn(repl, data.decode("utf-8"))
+        new_data = new.encode("utf-8")
+        p.write_bytes(new_data.replace(b"\n", b"\r\n") if crlf else new_data)
         _emit_status("sed", path=str(p), count=count)
         return count
 
@@ -523,29 +1045,39 @@ if "__omp_prelude_loaded__" not in globals():
         """Recursive sed across files matching glob_pattern. Respects .gitignore."""
         base = Path(path)
         ignore_patterns = _load_gitignore_patterns(base)
-        total = 0
-        files_changed = 0
-        changed_files = []
-        for file_path in base.rglob(glob_pattern):
-            if file_path.is_dir():
-                continue
-            # Skip hidden files unless requested
-            if not hidden and any(part.startswith(".") for part in file_path.parts):
-                continue
-            # Skip gitignored paths
-            if _match_gitignore(file_path, ignore_patterns, base):
-                continue
+        rx = _compile(pattern, flags)
+        # ASCII patterns run directly on ASCII files as bytes, skipping the decode
+        rx_b = _compile_bytes(pattern, flags)
+        repl_b = repl.encode("utf-8")
+
+        def substitute(file_path: Path) -> int:
             try:
-                data = file_path.read_text(encoding="utf-8")
-                new, count = re.subn(pattern, repl, data, flags=flags)
+                # Match on \n-normalized text like sed(); CRLF is restored on write
+                data, crlf = _normalize_newlines(file_path.read_bytes())
+                if rx_b is not None and data.isascii():
+                    new, count = rx_b.subn(repl_b, data)
+                else:
+                    new_text, count = rx.subn(repl, data.decode("utf-8"))
+                    new = new_text.encode("utf-8")
                 if count > 0:
-                    file_path.write_text(new, encoding="utf-8")
-                    total += count
-                    files_changed += 1
-                    if len(changed_files) < 10:
-                        changed_files.append({"file": str(file_path), "count": count})
+                    if crlf:
+                        new = new.replace(b"\n", b"\r\n")
+                    with _atomic_writer(file_path) as f:
+                        f.write(new)
+                return count
             except Exception:
-                continue
+                return 0
+
+        files = [fp for fp, entry, _ in _walk(base, glob_pattern, ignore_patterns, hidden) if not entry.is_dir()]
+        total = 0
+        files_changed = 0
+        changed_files = []
+        for file_path, count in zip(files, _parallel_map(substitute, files)):
+            if count > 0:
+                total += count
+                files_changed += 1
+                if len(changed_files) < 10:
+                    changed_files.append({"file": str(file_path), "count": count})
         _emit_status("rsed", path=str(base), count=total, files=files_changed, changed=changed_files)
         return total
 
@@ -553,28 +1085,69 @@ if "__omp_prelude_loaded__" not in globals():
     def lines(path: str | Path, start: int = 1, end: int | None = None) -> str:
         """Extract line range from file (1-indexed, inclusive). Like sed -n 'N,Mp'."""
         p = Path(path)
-        all_lines = p.read_text(encoding="utf-8").splitlines()
-        if end is None:
-            end = len(all_lines)
         start = max(1, start)
-        end = min(len(all_lines), end)
-        selected = all_lines[start - 1 : end]
+        window = None
+        # A negative end slices from the end, which needs the whole file
+        if end is None or end >= 0:
+            window = _read_line_window(p, start - 1, None if end is None else max(0, end - start + 1))
+        if window is not None:
+            text, skipped = window
+            selected = text.split("\n")
+            if selected[-1] == "":
+                selected.pop()
+            last = skipped + len(selected)
+            end = last if end is None else min(end, last)
+        else:
+            all_lines = p.read_text(encoding="utf-8").splitlines()
+            end = len(all_lines) if end is None else min(len(all_lines), end)
+            selected = all_lines[start - 1 : end]
         out = "\n".join(selected)
         _emit_status("lines", path=str(p), start=start, end=end, count=len(selected), preview=out[:500])
         return out
 
+    def _line_ending(f) -> bytes:
+        """Detect an open binary file's line ending from its first line break ("\\n" if none), then rewind it."""
+        head = f.read(_SCAN_CHUNK)
+        cr = head.find(b"\r")
+        lf = head.find(b"\n")
+        ending = b"\n"
+        if cr >= 0 and (lf < 0 or cr < lf):
+            ending = b"\r\n" if (head[cr + 1 : cr + 2] or f.read(1)) == b"\n" else b"\r"
+        f.seek(0)
+        return ending
+
+    def _split_cr_lines(f):
+        """Yield the lines of an open binary file that breaks lines at "\\r" alone, keeping line ends."""
+        tail = b""
+        while chunk := f.read(_SCAN_CHUNK):
+            lines = (tail + chunk).split(b"\r")
+            tail = lines.pop()
+            for line in lines:
+                yield line + b"\r"
+        if tail:
+            yield tail
+
+    def _file_lines(f, ending: bytes):
+        """Iterate an open binary file's lines for the given line ending, keeping line ends."""
+        return _split_cr_lines(f) if ending == b"\r" else f
+
     @_category("Line ops")
     def delete_lines(path: str | Path, start: int, end: int | None = None) -> int:
         """Delete line range from file (1-indexed, inclusive). Like sed -i 'N,Md'."""
         p = Path(path)
-        all_lines = p.read_text(encoding="utf-8").splitlines()
         if end is None:
             end = start
         start = max(1, start)
-        end = min(len(all_lines), end)
-        count = end - start + 1
-        new_lines = all_lines[: start - 1] + all_lines[end:]
-        p.write_text("\n".join(new_lines) + ("\n" if all_lines else ""), encoding="utf-8")
+        count = 0
+        total = 0
+        with p.open("rb") as src, _atomic_writer(p) as dst:
+            ending = _line_ending(src)
+            for total, line in enumerate(_file_lines(src, ending), 1):
+                if start <= total <= end:
+                    count += 1
+                    continue
+                dst.write(line if line.endswith(ending[-1:]) else line + ending)
+        end = min(total, end)
         _emit_status("delete_lines", path=str(p), start=start, end=end, count=count)
         return count
 
@@ -582,14 +1155,20 @@ if "__omp_prelude_loaded__" not in globals():
     def delete_matching(path: str | Path, pattern: str, *, regex: bool = True) -> int:
         """Delete lines matching pattern. Like sed -i '/pattern/d'."""
         p = Path(path)
-        all_lines = p.read_text(encoding="utf-8").splitlines()
-        if regex:
-            rx = re.compile(pattern)
-            new_lines = [l for l in all_lines if not rx.search(l)]
-        else:
-            new_lines = [l for l in all_lines if pattern not in l]
-        count = len(all_lines) - len(new_lines)
-        p.write_text("\n".join(new_lines) + ("\n" if all_lines else ""), encoding="utf-8")
+        match_str, match_bytes = _line_matchers(pattern, False, not regex)
+        count = 0
+        with p.open("rb") as src, _atomic_writer(p) as dst:
+            ending = _line_ending(src)
+            for line in _file_lines(src, ending):
+                content = line.rstrip(b"\r\n")
+                if match_bytes is not None and content.isascii():
+                    matched = match_bytes(content)
+                else:
+                    matched = match_str(content.decode("utf-8"))
+                if matched:
+                    count += 1
+                    continue
+                dst.write(line if line.endswith(ending[-1:]) else line + ending)
         _emit_status("delete_matching", path=str(p), pattern=pattern, count=count)
         return count
 
@@ -597,19 +1176,22 @@ if "__omp_prelude_loaded__" not in globals():
     def insert_at(path: str | Path, line_num: int, text: str, *, after: bool = True) -> Path:
         """Insert text at line. after=True (sed 'Na\\'), after=False (sed 'Ni\\')."""
         p = Path(path)
-        all_lines = p.read_text(encoding="utf-8").splitlines()
         new_lines = text.splitlines()
-        line_num = max(1, min(len(all_lines) + 1, line_num))
-        if after:
-            idx = min(line_num, len(all_lines))
-            all_lines = all_lines[:idx] + new_lines + all_lines[idx:]
-            pos = "after"
-        else:
-            idx = line_num - 1
-            all_lines = all_lines[:idx] + new_lines + all_lines[idx:]
-            pos = "before"
-        p.write_text("\n".join(all_lines) + "\n", encoding="utf-8")
-        _emit_status("insert_at", path=str(p), line=line_num, lines_inserted=len(new_lines), position=pos)
+        # Number of existing lines to copy before the inserted block (clamped at EOF)
+        keep = max(1, line_num) if after else max(0, line_num - 1)
+        total = 0
+        with p.open("rb") as src, _atomic_writer(p) as dst:
+            ending = _line_ending(src)
+            payload = b"".join(line.encode("utf-8") + ending for line in new_lines)
+            for line in _file_lines(src, ending):
+                if total == keep:
+                    dst.write(payload)
+                total += 1
+                dst.write(line if line.endswith(ending[-1:]) else line + ending)
+            if total <= keep:
+                dst.write(payload)
+        line_num = max(1, min(total + 1, line_num))
+        _emit_status("insert_at", path=str(p), line=line_num, lines_inserted=len(new_lines), position="after" if after else "before")
         return p
 
     @_category("Agent")
@@ -658,16 +1240,30 @@ if "__omp_prelude_loaded__" not in globals():
             _emit_status("output", error="query cannot be combined with offset/limit")
             raise ValueError("query cannot be combined with offset/limit")
         
-        results: list[dict] = []
+        try:
+            query_plan = _compile_query(query) if query else None
+        except ValueError as e:
+            _emit_status("output", error=f"Invalid query: {e}")
+            raise
+        # Slots for missing IDs stay None; any miss raises before results are returned
+        results: list[dict | None] = [None] * len(ids)
         not_found: list[str] = []
+        total_chars = 0
+        artifacts_path = Path(artifacts_dir)
         
-        for output_id in ids:
-            output_path = Path(artifacts_dir) / f"{output_id}.md"
-            if not output_path.exists():
+        for i, output_id in enumerate(ids):
+            output_path = artifacts_path / f"{output_id}.md"
+            try:
+                output_stat = os.stat(output_path)
+            except OSError:
                 not_found.append(output_id)
                 continue
             
-            raw_content = output_path.read_text(encoding="utf-8")
+            artifact = str(output_path)
+            raw_content = _lru_by_stat(
+                _CONTENT_CACHE, _CONTENT_CACHE_SIZE, artifact, output_stat,
+                lambda: output_path.read_text(encoding="utf-8"),
+            )
             raw_lines = raw_content.splitlines()
             total_lines = len(raw_lines)
             
@@ -677,13 +1273,16 @@ if "__omp_prelude_loaded__" not in globals():
             # Handle query
             if query:
                 try:
-                    json_value = json.loads(raw_content)
+                    json_value = _lru_by_stat(
+                        _ARTIFACT_JSON_CACHE, _ARTIFACT_JSON_CACHE_SIZE, artifact, output_stat,
+                        lambda: _json_loads(raw_content),
+                    )
                 except json.JSONDecodeError as e:
                     _emit_status("output", id=output_id, error=f"Not valid JSON: {e}")
                     raise ValueError(f"Output {output_id} is not valid JSON: {e}")
                 
                 # Apply jq-like query
-                result_value = _apply_query(json_value, query)
+                result_value = _run_query_plan(json_value, query_plan)
                 try:
                     selected_content = json.dumps(result_value, indent=2) if result_value is not None else "null"
                 except (TypeError, ValueError):
@@ -704,128 +1303,168 @@ if "__omp_prelude_loaded__" not in globals():
             
             # Strip ANSI codes if requested
             if format == "stripped":
-                import re
                 selected_content = re.sub(r"\x1b\[[0-9;]*m", "", selected_content)
             
             # Build result
             if format == "json":
+                char_count = len(raw_content) if not query else len(selected_content)
                 result_data = {
                     "id": output_id,
-                    "path": str(output_path),
+                    "path": artifact,
                     "line_count": total_lines if not query else len(selected_content.splitlines()),
-                    "char_count": len(raw_content) if not query else len(selected_content),
+                    "char_count": char_count,
                     "content": selected_content,
                 }
                 if range_info:
                     result_data["range"] = range_info
                 if query:
                     result_data["query"] = query
-                results.append(result_data)
+                results[i] = result_data
+                total_chars += char_count
             else:
-                results.append({"id": output_id, "content": selected_content})
+                results[i] = {"id": output_id, "content": selected_content}
+                total_chars += len(selected_content)
         
         # Handle not found
         if not_found:
-            available = sorted(
-                [f.stem for f in Path(artifacts_dir).glob("*.md")]
-            )
+            index = _get_artifact_index(artifacts_dir)
             error_msg = f"Output not found: {', '.join(not_found)}"
-            if available:
-                error_msg += f"\n\nAvailable outputs: {', '.join(available[:20])}"
-                if len(available) > 20:
-                    error_msg += f" (and {len(available) - 20} more)"
-            _emit_status("output", not_found=not_found, available_count=len(available))
+            if index:
+                error_msg += f"\n\nAvailable outputs: {', '.join(heapq.nsmallest(20, index))}"
+                if len(index) > 20:
+                    error_msg += f" (and {len(index) - 20} more)"
+            _emit_status("output", not_found=not_found, available_count=len(index))
             raise FileNotFoundError(error_msg)
         
         # Return format
         if len(ids) == 1:
-            if format == "json":
-                _emit_status("output", id=ids[0], chars=results[0]["char_count"])
-                return results[0]
-            _emit_status("output", id=ids[0], chars=len(results[0]["content"]))
-            return results[0]["content"]
-        
-        # Multiple IDs
-        if format == "json":
-            total_chars = sum(r["char_count"] for r in results)
-            _emit_status("output", count=len(results), total_chars=total_chars)
-            return results
-        
-        combined_output: list[dict] = []
-        for r in results:
-            combined_output.append({"id": r["id"], "content": r["content"]})
-        total_chars = sum(len(r["content"]) for r in combined_output)
-        _emit_status("output", count=len(combined_output), total_chars=total_chars)
-        return combined_output
-
-    def _apply_query(data: any, query: str) -> any:
-        """Apply jq-like query to data. Supports .key, [index], and chaining."""
-        if not query:
-            return data
+            result = results[0]
+            _emit_status("output", id=ids[0], chars=total_chars)
+            return result if format == "json" else result["content"]
         
+        # Multiple IDs: non-json results are already {"id", "content"} dicts
+        _emit_status("output", count=len(results), total_chars=total_chars)
+        return results
+
+    _ARTIFACT_INDEX_CACHE: dict[str, tuple[int, dict[str, str]]] = {}
+
+    def _get_artifact_index(artifacts_dir: str) -> dict[str, str]:
+        """Map artifact ID to path for *.md files, rebuilt only when the directory mtime changes."""
+        try:
+            mtime_ns = os.stat(artifacts_dir).st_mtime_ns
+        except OSError:
+            _ARTIFACT_INDEX_CACHE.pop(artifacts_dir, None)
+            return {}
+        cached = _ARTIFACT_INDEX_CACHE.get(artifacts_dir)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        with os.scandir(artifacts_dir) as it:
+            index = {
+                entry.name[:-3]: entry.path
+                for entry in it
+                if entry.name.endswith(".md") and entry.is_file()
+            }
+        _ARTIFACT_INDEX_CACHE[artifacts_dir] = (mtime_ns, index)
+        return index
+
+    def _json_loads(raw: str):
+        """Parse JSON with orjson when installed, falling back to json for inputs orjson rejects."""
+        if _orjson is not None:
+            try:
+                return _orjson.loads(raw)
+            except _orjson.JSONDecodeError:
+                pass  # e.g. NaN, or integers beyond 64 bits on releases that reject them
+        return json.loads(raw)
+
+    def _lru_by_stat(cache: OrderedDict, max_size: int, path: str, st: os.stat_result, load):
+        """Return the cached value for path while its (mtime_ns, size) is unchanged, else load() and cache it.
+
+        Files over _ARTIFACT_CACHE_MAX_BYTES are loaded every time, which bounds the memory a full cache holds.
+        """
+        key = (st.st_mtime_ns, st.st_size)
+        cached = cache.get(path)
+        if cached is not None and cached[0] == key:
+            cache.move_to_end(path)
+            return cached[1]
+        value = load()
+        if st.st_size > _ARTIFACT_CACHE_MAX_BYTES:
+            # Drop any stale entry so an outgrown file does not pin its old value
+            cache.pop(path, None)
+            return value
+        cache[path] = (key, value)
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+        return value
+
+    # Artifact text and parsed JSON, keyed by path and validated by _lru_by_stat
+    _CONTENT_CACHE: OrderedDict[str, tuple[tuple[int, int], str]] = OrderedDict()
+    _CONTENT_CACHE_SIZE = 64
+    _ARTIFACT_JSON_CACHE: OrderedDict[str, tuple[tuple[int, int], any]] = OrderedDict()
+    _ARTIFACT_JSON_CACHE_SIZE = 16
+    _ARTIFACT_CACHE_MAX_BYTES = 1 << 20
+
+    _QUERY_KEY = 0
+    _QUERY_INDEX = 1
+
+    # A bracketed step (group 2 is empty when the "]" is missing) or a bare key
+    _QUERY_TOKEN_RE = re.compile(r"\[([^\]]*)(\]?)|([^.\[]+)")
+
+    @functools.lru_cache(maxsize=512)
+    def _compile_query(query: str) -> tuple[tuple[int, str | int], ...]:
+        """Compile a jq-like query into (_QUERY_KEY, name) / (_QUERY_INDEX, n) steps."""
         query = query.strip()
-        if query.startswith("."):
-            query = query[1:]
-        if not query:
-            return data
-        
-        # Parse query into tokens
+        if "[" not in query:
+            return tuple((_QUERY_KEY, sys.intern(key)) for key in query.split(".") if key)
         tokens = []
-        current_token = ""
-        i = 0
-        while i < len(query):
-            ch = query[i]
-            if ch == ".":
-                if current_token:
-                    tokens.append(("key", current_token))
-                    current_token = ""
-            elif ch == "[":
-                if current_token:
-                    tokens.append(("key", current_token))
-                    current_token = ""
-                # Find matching ]
-                j = i + 1
-                while j < len(query) and query[j] != "]":
-                    j += 1
-                bracket_content = query[i+1:j]
-                if bracket_content.startswith('"') and bracket_content.endswith('"'):
-                    tokens.append(("key", bracket_content[1:-1]))
-                else:
-                    tokens.append(("index", int(bracket_content)))
-                i = j
+        for m in _QUERY_TOKEN_RE.finditer(query):
+            key = m.group(3)
+            if key is not None:
+                tokens.append((_QUERY_KEY, sys.intern(key)))
+                continue
+            if not m.group(2):
+                raise ValueError(f"Unterminated '[' in query: {query!r}")
+            bracket_content = m.group(1)
+            if bracket_content.startswith('"') and bracket_content.endswith('"'):
+                tokens.append((_QUERY_KEY, sys.intern(bracket_content[1:-1])))
             else:
-                current_token += ch
-            i += 1
-        if current_token:
-            tokens.append(("key", current_token))
-        
-        # Apply tokens
+                tokens.append((_QUERY_INDEX, int(bracket_content)))
+        return tuple(tokens)
+
+    def _run_query_plan(data: any, plan: tuple[tuple[int, str | int], ...]) -> any:
+        """Walk parsed JSON along a compiled query; None when a step does not resolve."""
         current = data
-        for token_type, value in tokens:
-            if token_type == "index":
-                if not isinstance(current, list) or value >= len(current):
+        for op, value in plan:
+            if op == _QUERY_KEY:
+                if type(current) is not dict:
                     return None
-                current = current[value]
-            elif token_type == "key":
-                if not isinstance(current, dict) or value not in current:
+                current = current.get(value)
+            else:
+                if type(current) is not list or value >= len(current):
                     return None
                 current = current[value]
+            if current is None:
+                return None
         
         return current
 
+    @functools.lru_cache(maxsize=256)
+    def _helper_doc(fn) -> tuple[str, str]:
+        """Return (signature, first docstring line) for a helper, computed once per function."""
+        doc = inspect.getdoc(fn) or ""
+        return str(inspect.signature(fn)), doc.splitlines()[0] if doc else ""
+
     def __omp_prelude_docs__() -> list[dict[str, str]]:
-        """Return prelude helper docs for templating. Discovers functions by _omp_category attribute."""
-        helpers: list[dict[str, str]] = []
-        for name, obj in globals().items():
-            if not callable(obj) or not hasattr(obj, "_omp_category"):
-                continue
-            signature = str(inspect.signature(obj))
-            doc = inspect.getdoc(obj) or ""
-            docline = doc.splitlines()[0] if doc else ""
-            helpers.append({
-                "name": name,
-                "signature": signature,
-                "docstring": docline,
-                "category": obj._omp_category,
-            })
-        return sorted(helpers, key=lambda h: (h["category"], h["name"]))
+        """Return prelude helper docs for templating. Rebuilt only after _category registers a helper."""
+        global _PRELUDE_DOCS_CACHE
+        if _PRELUDE_DOCS_CACHE is None:
+            helpers: list[dict[str, str]] = []
+            for name, fn in _OMP_HELPERS.items():
+                signature, docline = _helper_doc(fn)
+                helpers.append({
+                    "name": name,
+                    "signature": signature,
+                    "docstring": docline,
+                    "category": fn._omp_category,
+                })
+            _PRELUDE_DOCS_CACHE = sorted(helpers, key=lambda h: (h["category"], h["name"]))
+        return _PRELUDE_DOCS_CACHE
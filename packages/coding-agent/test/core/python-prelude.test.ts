@@ -37,24 +37,40 @@ const hasKernelDeps = (() => {
 
 const shouldRun = Boolean(pythonPath) && hasKernelDeps;
 
+const createSession = () => ({
+	cwd: process.cwd(),
+	hasUI: false,
+	getSessionFile: () => null,
+	getSessionSpawns: () => null,
+	settings: Settings.isolated({
+		"lsp.diagnosticsOnWrite": false,
+		"python.toolMode": "ipy-only",
+		"python.kernelMode": "per-call",
+		"python.sharedGateway": true,
+	}),
+});
+
+const runPython = async (code: string): Promise<string> => {
+	const tool = new PythonTool(createSession());
+	const result = await tool.execute("tool-call", { cells: [{ code }] });
+	return result.content.find(item => item.type === "text")?.text ?? "";
+};
+
+// Points output() at a fresh artifacts directory holding the given files
+const artifactsSetup = (files: Record<string, string>) => `
+	import tempfile
+	session_root = Path(tempfile.mkdtemp())
+	os.environ["PI_SESSION_FILE"] = str(session_root / "session.jsonl")
+	(session_root / "session").mkdir()
+	for artifact_name, artifact_content in ${JSON.stringify(files)}.items():
+	    (session_root / "session" / artifact_name).write_text(artifact_content)
+`;
+
 describe.skipIf(!shouldRun)("PYTHON_PRELUDE integration", () => {
 	it("exposes prelude helpers via python tool", async () => {
 		const helpers = ["env", "read", "write", "append", "rm", "mv", "cp", "find", "grep"];
 
-		const session = {
-			cwd: process.cwd(),
-			hasUI: false,
-			getSessionFile: () => null,
-			getSessionSpawns: () => null,
-			settings: Settings.isolated({
-				"lsp.diagnosticsOnWrite": false,
-				"python.toolMode": "ipy-only",
-				"python.kernelMode": "per-call",
-				"python.sharedGateway": true,
-			}),
-		};
-
-		const tool = new PythonTool(session);
+		const tool = new PythonTool(createSession());
 		const code = `
 	helpers = ${JSON.stringify(helpers)}
 	missing = [name for name in helpers if name not in globals() or not callable(globals()[name])]
@@ -73,6 +89,146 @@ describe.skipIf(!shouldRun)("PYTHON_PRELUDE integration", () => {
 		expect(output).toContain("DOCS_OK=1");
 	});
 
+	it("matches Path.rglob for path-shaped find patterns", async () => {
+		const patterns = [
+			"*.py",
+			"src/*.py",
+			"src/**/*.py",
+			"src/**",
+			"src/*/",
+			"src/**/",
+			"**/src/*.py",
+			"*/src/**/*.py",
+			"src/**/**/*.py",
+			"x/**/h.py",
+		];
+		const files = ["a.py", "src/a.py", "src/b.txt", "src/x/y/c.py", "src/x/d.py", "lib/src/e.py", "x/src/y/h.py"];
+
+		const tool = new PythonTool(createSession());
+		const code = `
+	import tempfile
+	root = Path(tempfile.mkdtemp())
+	for name in ${JSON.stringify(files)}:
+	    (root / name).parent.mkdir(parents=True, exist_ok=True)
+	    (root / name).write_text("x\\n")
+	mismatched = [
+	    pat for pat in ${JSON.stringify(patterns)}
+	    if sorted(find(pat, root, type="any")) != sorted(root.rglob(pat))
+	]
+	shutil.rmtree(root)
+	print("GLOB_MISMATCHES=" + ",".join(mismatched))
+	`;
+
+		const result = await tool.execute("tool-call-glob", { cells: [{ code }] });
+		const output = result.content.find(item => item.type === "text")?.text ?? "";
+		expect(output).toContain("GLOB_MISMATCHES=\n");
+	});
+
+	it("numbers lines like splitlines() in files with CR-only and form-feed breaks", async () => {
+		const output = await runPython(`
+	import tempfile
+	root = Path(tempfile.mkdtemp())
+	(root / "cr.txt").write_bytes(b"one\\rtwo\\rthree\\r")
+	(root / "ff.txt").write_bytes(b"one\\x0ctwo\\nthree\\nfour\\n")
+	checks = {
+	    "cr read": read(root / "cr.txt", offset=2, limit=1) == "two\\n",
+	    "cr lines": lines(root / "cr.txt", 2, 3) == "two\\nthree",
+	    "cr negative end": lines(root / "cr.txt", 1, -1) == "one\\ntwo",
+	    "ff read": read(root / "ff.txt", offset=2, limit=1) == "two\\n",
+	    "ff lines": lines(root / "ff.txt", 2, 3) == "two\\nthree",
+	    "ff negative limit": read(root / "ff.txt", limit=-1) == "one\\x0ctwo\\nthree\\n",
+	}
+	shutil.rmtree(root)
+	print("LINE_MISMATCHES=" + ",".join(name for name, ok in checks.items() if not ok))
+	`);
+		expect(output).toContain("LINE_MISMATCHES=\n");
+	});
+
+	it("keeps CRLF and CR-only line endings in line edits", async () => {
+		const output = await runPython(`
+	import tempfile
+	root = Path(tempfile.mkdtemp())
+	crlf = root / "crlf.txt"
+	crlf.write_bytes(b"a\\r\\nb")
+	insert_at(crlf, 1, "X\\nY")
+	after_insert = crlf.read_bytes()
+	delete_matching(crlf, "^Y$")
+	after_match = crlf.read_bytes()
+	cr = root / "cr.txt"
+	cr.write_bytes(b"one\\rtwo\\rthree\\r")
+	delete_lines(cr, 2)
+	checks = {
+	    "crlf insert_at": after_insert == b"a\\r\\nX\\r\\nY\\r\\nb\\r\\n",
+	    "crlf delete_matching": after_match == b"a\\r\\nX\\r\\nb\\r\\n",
+	    "cr delete_lines": cr.read_bytes() == b"one\\rthree\\r",
+	}
+	shutil.rmtree(root)
+	print("ENDING_MISMATCHES=" + ",".join(name for name, ok in checks.items() if not ok))
+	`);
+		expect(output).toContain("ENDING_MISMATCHES=\n");
+	});
+
+	it("restores CRLF only on files that use it throughout in sed, rsed, and replace", async () => {
+		const output = await runPython(`
+	import tempfile
+	root = Path(tempfile.mkdtemp())
+	for name in ("sed", "rsed", "replace"):
+	    (root / name).mkdir()
+	    (root / name / "crlf.txt").write_bytes(b"foo\\r\\nbar\\r\\n")
+	    (root / name / "mixed.txt").write_bytes(b"foo\\r\\nbar\\n")
+	for f in ("crlf.txt", "mixed.txt"):
+	    sed(root / "sed" / f, "foo$", "X", flags=re.M)
+	    replace(root / "replace" / f, "foo", "X")
+	rsed("foo$", "X", root / "rsed", flags=re.M)
+	results = {
+	    (name, f): (root / name / f).read_bytes()
+	    for name in ("sed", "rsed", "replace") for f in ("crlf.txt", "mixed.txt")
+	}
+	shutil.rmtree(root)
+	expected = {"crlf.txt": b"X\\r\\nbar\\r\\n", "mixed.txt": b"X\\nbar\\n"}
+	print("ENDING_MISMATCHES=" + ",".join(f"{name}:{f}" for (name, f), data in results.items() if data != expected[f]))
+	`);
+		expect(output).toContain("ENDING_MISMATCHES=\n");
+	});
+
+	it("keeps integers wider than 64 bits exact in output() queries", async () => {
+		const output = await runPython(`${artifactsSetup({ "j.md": '{"big": 1180591620717411303424}' })}
+	print("BIG=" + output("j", query=".big"))
+	`);
+		expect(output).toContain("BIG=1180591620717411303424");
+	});
+
+	it("resolves quoted keys, empty segments, and negative indexes in output() queries", async () => {
+		const data = { "k.y": 1, "": 2, a: { b: 4 }, l: [10, 20, 30] };
+		const output = await runPython(`${artifactsSetup({ "j.md": JSON.stringify(data) })}
+	checks = {
+	    "quoted dotted key": output("j", query='.["k.y"]') == "1",
+	    "quoted empty key": output("j", query='.[""]') == "2",
+	    "empty segment": output("j", query=".a..b") == "4",
+	    "negative index": output("j", query=".l[-1]") == "30",
+	}
+	try:
+	    output("j", query=".l[")
+	    checks["unterminated bracket"] = False
+	except ValueError:
+	    checks["unterminated bracket"] = True
+	print("QUERY_MISMATCHES=" + ",".join(name for name, ok in checks.items() if not ok))
+	`);
+		expect(output).toContain("QUERY_MISMATCHES=\n");
+	});
+
+	it("lists only artifact files when an output() ID is not found", async () => {
+		const output = await runPython(`${artifactsSetup({ "real.md": "x" })}
+	(session_root / "session" / "nested.md").mkdir()
+	try:
+	    output("missing")
+	except FileNotFoundError as e:
+	    print("AVAILABLE=" + str(e).rsplit("Available outputs: ", 1)[-1])
+	`);
+		expect(output).toContain("AVAILABLE=real");
+		expect(output).not.toContain("nested");
+	});
+
 	it("exposes prelude docs via warmup", async () => {
 		resetPreludeDocsCache();
 		const result = await warmPythonEnvironment(process.cwd());